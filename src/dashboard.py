@@ -5,16 +5,12 @@ Displays live-updating visualizations from DuckDB
 """
 
 import streamlit as st
+from streamlit_autorefresh import st_autorefresh
 import duckdb
 import plotly.express as px
-import plotly.graph_objects as go
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
-import pandas as pd
-from datetime import datetime
+from datetime import date, datetime
 from pathlib import Path
-import json
-import time
+import os
 
 # Page config
 st.set_page_config(
@@ -46,90 +42,252 @@ st.markdown("""
 # Database connection
 @st.cache_resource
 def get_db_connection():
-    """Get DuckDB connection."""
-    return duckdb.connect('data/youtube.duckdb', read_only=True)
+    """Get DuckDB connection, tuned once for the dashboard's repeated scans."""
+    return duckdb.connect(
+        'data/youtube.duckdb',
+        read_only=True,
+        config={
+            'threads': os.cpu_count() or 1,
+            'enable_object_cache': True
+        }
+    )
 
 @st.cache_data
 def load_video_titles():
-    """Load actual video titles from JSON files."""
-    video_titles = {}
+    """Load actual video titles from the per-video .meta.json headers."""
     data_dir = Path('data/raw')
     
-    if data_dir.exists():
-        for json_file in data_dir.glob('*.json'):
-            try:
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    video_id = json_file.stem
-                    video_title = data.get('video_title', video_id)
-                    video_titles[video_id] = video_title
-            except Exception as e:
-                # If we can't read the file, use video ID as fallback
-                video_titles[json_file.stem] = json_file.stem
-    
-    return video_titles
+    if not data_dir.exists() or not any(data_dir.glob('*.meta.json')):
+        return {}
+    
+    # One native DuckDB scan over every header file, projecting only the title;
+    # unreadable files are skipped and fall back to the video ID in the caller
+    with duckdb.connect() as conn:
+        rows = conn.execute("""
+            SELECT video_id, COALESCE(video_title, video_id)
+            FROM read_json(
+                ?,
+                columns={'video_id': 'VARCHAR', 'video_title': 'VARCHAR'},
+                format='auto',
+                ignore_errors=true
+            )
+            WHERE video_id IS NOT NULL
+        """, [str(data_dir / '*.meta.json')]).fetchall()
+    
+    return dict(rows)
+
+# Query results are cached for one auto-refresh interval so widget changes
+# and reruns are served from memory instead of rescanning DuckDB.
+# Everything except the timeline reads video_stats, the per-video/sentiment
+# rollup the pipeline maintains at analysis time.
+
+# Same shape as the rollup tables, grouped from comments, for databases the
+# pipeline hasn't run against since those tables were added
+VIDEO_STATS_FALLBACK = """(
+    SELECT video_id, category, sentiment_label::VARCHAR AS sentiment_label,
+           COUNT(*) AS comment_count, SUM(sentiment_score) AS score_sum
+    FROM comments
+    WHERE sentiment_label IS NOT NULL
+    GROUP BY ALL
+)"""
+PHRASE_STATS_FALLBACK = """(
+    SELECT video_id, category, sentiment_label, phrase, COUNT(*) AS count
+    FROM (
+        SELECT video_id, category, sentiment_label::VARCHAR AS sentiment_label,
+               UNNEST(from_json(phrases, '["VARCHAR"]')) AS phrase
+        FROM comments
+        WHERE sentiment_label IS NOT NULL
+    )
+    GROUP BY ALL
+)"""
 
-def load_data():
-    """Load all data from DuckDB."""
+@st.cache_data(ttl=300, show_spinner=False)
+def rollup_sources():
+    """FROM targets for video_stats and phrase_stats, falling back to comments if missing."""
     conn = get_db_connection()
-    
-    # Main comments data
-    df = conn.execute("""
-        SELECT 
-            comment_id,
+    existing = {
+        row[0] for row in conn.execute(
+            "SELECT table_name FROM duckdb_tables() WHERE schema_name = 'main'"
+        ).fetchall()
+    }
+    return (
+        'video_stats' if 'video_stats' in existing else VIDEO_STATS_FALLBACK,
+        'phrase_stats' if 'phrase_stats' in existing else PHRASE_STATS_FALLBACK
+    )
+
+@st.cache_data(ttl=300, show_spinner=False)
+def list_categories():
+    """Distinct categories of analyzed comments, for the sidebar filter."""
+    conn = get_db_connection()
+    video_stats, _ = rollup_sources()
+    rows = conn.execute(f"""
+        SELECT DISTINCT category
+        FROM {video_stats}
+        WHERE sentiment_label IS NOT NULL
+        ORDER BY category
+    """).fetchall()
+    return [row[0] for row in rows]
+
+@st.cache_data(ttl=300, show_spinner=False)
+def list_sentiments():
+    """Distinct sentiment labels of analyzed comments, for the sidebar filter."""
+    conn = get_db_connection()
+    video_stats, _ = rollup_sources()
+    rows = conn.execute(f"""
+        SELECT DISTINCT sentiment_label
+        FROM {video_stats}
+        WHERE sentiment_label IS NOT NULL
+        ORDER BY sentiment_label
+    """).fetchall()
+    return [row[0] for row in rows]
+
+# Shared WHERE clause for the sidebar filters, bound via filter_params().
+# comments.sentiment_label may be an ENUM; compare it as text so 'All' never
+# has to be cast to the enum.
+FILTER_CLAUSE = """
+    sentiment_label IS NOT NULL
+    AND (? = 'All' OR category = ?)
+    AND (? = 'All' OR sentiment_label::VARCHAR = ?)
+"""
+
+def filter_params(category, sentiment):
+    """Positional parameters for FILTER_CLAUSE."""
+    return [category, category, sentiment, sentiment]
+
+# Timeline tracks recent comments only
+TIMELINE_START_DATE = date(2025, 7, 1)
+
+@st.cache_data(ttl=30, show_spinner=False)
+def load_summary_metrics(category='All', sentiment='All'):
+    """Key metric values for the current filters in a single scan."""
+    conn = get_db_connection()
+    video_stats, _ = rollup_sources()
+    total, positive_pct, neutral_pct, negative_pct, avg_score, total_videos = conn.execute(f"""
+        SELECT
+            SUM(comment_count),
+            SUM(comment_count) FILTER (WHERE sentiment_label = 'positive') * 100.0 / NULLIF(SUM(comment_count), 0),
+            SUM(comment_count) FILTER (WHERE sentiment_label = 'neutral') * 100.0 / NULLIF(SUM(comment_count), 0),
+            SUM(comment_count) FILTER (WHERE sentiment_label = 'negative') * 100.0 / NULLIF(SUM(comment_count), 0),
+            SUM(score_sum) / NULLIF(SUM(comment_count), 0),
+            COUNT(DISTINCT video_id)
+        FROM {video_stats}
+        WHERE {FILTER_CLAUSE}
+    """, filter_params(category, sentiment)).fetchone()
+    
+    return {
+        'total_comments': int(total or 0),
+        'positive_pct': positive_pct or 0.0,
+        'neutral_pct': neutral_pct or 0.0,
+        'negative_pct': negative_pct or 0.0,
+        'avg_score': avg_score or 0.0,
+        'total_videos': total_videos
+    }
+
+@st.cache_data(ttl=30, show_spinner=False)
+def load_sentiment_by_category():
+    """Comment counts per category and sentiment (ignores sidebar filters)."""
+    conn = get_db_connection()
+    video_stats, _ = rollup_sources()
+    return conn.execute(f"""
+        SELECT category, sentiment_label, SUM(comment_count) AS count
+        FROM {video_stats}
+        WHERE sentiment_label IS NOT NULL
+        GROUP BY category, sentiment_label
+        ORDER BY category, sentiment_label
+    """).df()
+
+@st.cache_data(ttl=30, show_spinner=False)
+def load_sentiment_timeline(category='All', sentiment='All'):
+    """Daily comment counts per sentiment since TIMELINE_START_DATE."""
+    conn = get_db_connection()
+    return conn.execute(f"""
+        SELECT CAST(published_at AS DATE) AS date, sentiment_label::VARCHAR AS sentiment_label, COUNT(*) AS count
+        FROM comments
+        WHERE {FILTER_CLAUSE} AND published_at >= ?
+        GROUP BY date, sentiment_label
+        ORDER BY date
+    """, filter_params(category, sentiment) + [TIMELINE_START_DATE]).df()
+
+@st.cache_data(ttl=30, show_spinner=False)
+def load_top_videos(category='All', sentiment='All', limit=12):
+    """Videos with the most comments, with their average sentiment score."""
+    conn = get_db_connection()
+    video_stats, _ = rollup_sources()
+    return conn.execute(f"""
+        SELECT
             video_id,
             category,
-            text,
-            like_count,
-            published_at,
-            sentiment_label,
-            sentiment_score,
-            phrases
-        FROM comments
+            SUM(comment_count) AS comment_count,
+            SUM(score_sum) / SUM(comment_count) AS avg_sentiment
+        FROM {video_stats}
+        WHERE {FILTER_CLAUSE}
+        GROUP BY video_id, category
+        ORDER BY comment_count DESC
+        LIMIT ?
+    """, filter_params(category, sentiment) + [limit]).df()
+
+@st.cache_data(ttl=30, show_spinner=False)
+def load_sentiment_distribution(category='All', sentiment='All'):
+    """Comment counts per sentiment label for the current filters."""
+    conn = get_db_connection()
+    video_stats, _ = rollup_sources()
+    return conn.execute(f"""
+        SELECT sentiment_label, SUM(comment_count) AS count
+        FROM {video_stats}
+        WHERE {FILTER_CLAUSE}
+        GROUP BY sentiment_label
+        ORDER BY count DESC
+    """, filter_params(category, sentiment)).df()
+
+@st.cache_data(ttl=30, show_spinner=False)
+def load_category_distribution():
+    """Comment counts per category (ignores sidebar filters)."""
+    conn = get_db_connection()
+    video_stats, _ = rollup_sources()
+    return conn.execute(f"""
+        SELECT category, SUM(comment_count) AS count
+        FROM {video_stats}
         WHERE sentiment_label IS NOT NULL
+        GROUP BY category
+        ORDER BY count DESC
     """).df()
-    
-    return df
 
-def extract_all_phrases(df):
-    """Extract all phrases from the JSON column - only multi-word, meaningful phrases."""
-    all_phrases = []
-    
-    # Filler phrases to exclude
-    filler_patterns = {
-        'looks like', 'look like', 'feel like', 'feels like', 
-        'seems like', 'seem like', 'sounds like', 'sound like',
-        'kinda like', 'kind like', 'sorta like', 'sort like',
-        'really like', 'really cool', 'really good', 'really nice',
-        'thats like', 'thats pretty', 'going like', 'walks like'
-    }
-    
-    for phrases_json in df['phrases'].dropna():
-        try:
-            phrases = json.loads(phrases_json) if isinstance(phrases_json, str) else phrases_json
-            if isinstance(phrases, list):
-                for p in phrases:
-                    # Only keep multi-word phrases (2+ words)
-                    if len(p.split()) >= 2:
-                        # Skip filler phrases
-                        if p.lower().strip() not in filler_patterns:
-                            # Skip if too short
-                            if len(p) >= 5:
-                                all_phrases.append(p)
-        except:
-            continue
-    return all_phrases
+# Filler phrases to exclude from phrase visualizations
+PHRASE_FILLERS = [
+    'looks like', 'look like', 'feel like', 'feels like', 
+    'seems like', 'seem like', 'sounds like', 'sound like',
+    'kinda like', 'kind like', 'sorta like', 'sort like',
+    'really like', 'really cool', 'really good', 'really nice',
+    'thats like', 'thats pretty', 'going like', 'walks like'
+]
+
+@st.cache_data(ttl=30, show_spinner=False)
+def load_phrase_counts(category='All'):
+    """Count meaningful multi-word phrases per sentiment label inside DuckDB."""
+    conn = get_db_connection()
+    _, phrase_stats = rollup_sources()
+    
+    # phrase_stats is pre-aggregated at analysis time; only keep multi-word
+    # phrases of 5+ characters that aren't filler
+    return conn.execute(f"""
+        SELECT sentiment_label, phrase, SUM(count) AS count
+        FROM {phrase_stats}
+        WHERE (? = 'All' OR category = ?)
+          AND length(phrase) >= 5
+          AND len(regexp_split_to_array(trim(phrase), '\\s+')) >= 2
+          AND NOT list_contains(?, lower(trim(phrase)))
+        GROUP BY sentiment_label, phrase
+        ORDER BY count DESC
+    """, [category, category, PHRASE_FILLERS]).df()
 
-def create_wordcloud(phrases_list, title, colormap='viridis'):
-    """Generate a word cloud from phrases."""
-    if not phrases_list:
+@st.cache_data(ttl=30, show_spinner=False)
+def create_wordcloud(phrase_frequencies, colormap='viridis'):
+    """Render a word cloud image from phrase frequencies, cached across reruns."""
+    if not phrase_frequencies:
         return None
     
-    # Join phrases into a single string
-    text = ' '.join(phrases_list)
-    
-    if not text.strip():
-        return None
+    # Imported here so reruns that hit the cache never pay for it
+    from wordcloud import WordCloud
     
     wordcloud = WordCloud(
         width=800,
@@ -139,13 +297,9 @@ def create_wordcloud(phrases_list, title, colormap='viridis'):
         max_words=50,
         relative_scaling=0.5,
         min_font_size=10
-    ).generate(text)
+    ).generate_from_frequencies(phrase_frequencies)
     
-    fig, ax = plt.subplots(figsize=(10, 5))
-    ax.imshow(wordcloud, interpolation='bilinear')
-    ax.axis('off')
-    ax.set_title(title, fontsize=16, fontweight='bold')
-    return fig
+    return wordcloud.to_image()
 
 def main():
     """Main dashboard function."""
@@ -160,66 +314,56 @@ def main():
     
     if auto_refresh:
         st.sidebar.info("Dashboard will refresh every 30 seconds")
-        time.sleep(0.1)  # Small delay to allow UI update
+        # Browser-side timer triggers the rerun, so no server thread is parked waiting
+        st_autorefresh(interval=30_000, key="auto_refresh")
     
-    # Load data
+    # Load filter options
     with st.spinner("Loading data from DuckDB..."):
-        df = load_data()
+        category_options = list_categories()
+        sentiment_options = list_sentiments()
     
-    if df.empty:
+    if not category_options:
         st.error("No data found in database. Please run the ingestion and analysis pipeline first.")
         return
     
-    # Convert published_at to datetime
-    df['published_at'] = pd.to_datetime(df['published_at'])
-    
     # Sidebar filters
     st.sidebar.markdown("---")
     st.sidebar.subheader("📊 Filters")
     
-    categories = ['All'] + sorted(df['category'].unique().tolist())
+    categories = ['All'] + category_options
     selected_category = st.sidebar.selectbox("Category", categories)
     
-    sentiments = ['All'] + sorted(df['sentiment_label'].unique().tolist())
+    sentiments = ['All'] + sentiment_options
     selected_sentiment = st.sidebar.selectbox("Sentiment", sentiments)
     
-    # Apply filters
-    filtered_df = df.copy()
-    if selected_category != 'All':
-        filtered_df = filtered_df[filtered_df['category'] == selected_category]
-    if selected_sentiment != 'All':
-        filtered_df = filtered_df[filtered_df['sentiment_label'] == selected_sentiment]
-    
     # Key Metrics
     st.markdown("---")
     col1, col2, col3, col4, col5 = st.columns(5)
     
+    metrics = load_summary_metrics(selected_category, selected_sentiment)
+    
     with col1:
-        st.metric("Total Comments", f"{len(filtered_df):,}")
+        st.metric("Total Comments", f"{metrics['total_comments']:,}")
     
     with col2:
-        positive_pct = (filtered_df['sentiment_label'] == 'positive').sum() / len(filtered_df) * 100
-        st.metric("Positive", f"{positive_pct:.1f}%")
+        st.metric("Positive", f"{metrics['positive_pct']:.1f}%")
     
     with col3:
-        neutral_pct = (filtered_df['sentiment_label'] == 'neutral').sum() / len(filtered_df) * 100
-        st.metric("Neutral", f"{neutral_pct:.1f}%")
+        st.metric("Neutral", f"{metrics['neutral_pct']:.1f}%")
     
     with col4:
-        negative_pct = (filtered_df['sentiment_label'] == 'negative').sum() / len(filtered_df) * 100
-        st.metric("Negative", f"{negative_pct:.1f}%")
+        st.metric("Negative", f"{metrics['negative_pct']:.1f}%")
     
     with col5:
-        avg_score = filtered_df['sentiment_score'].mean()
-        st.metric("Avg Score", f"{avg_score:.3f}")
+        st.metric("Avg Score", f"{metrics['avg_score']:.3f}")
     
     st.markdown("---")
     
     # VISUALIZATION 1: Sentiment Distribution by Category
     st.subheader("📊 1. Sentiment Distribution by Category")
     
-    # Use unfiltered df to show all categories
-    sentiment_by_category = df.groupby(['category', 'sentiment_label']).size().reset_index(name='count')
+    # Ignore sidebar filters to show all categories
+    sentiment_by_category = load_sentiment_by_category()
     
     # Ensure we have data
     if not sentiment_by_category.empty:
@@ -243,35 +387,39 @@ def main():
     st.markdown("---")
     st.subheader("☁️ 2. Top Phrases by Sentiment")
     
+    phrase_counts = load_phrase_counts(selected_category)
+    if selected_sentiment != 'All':
+        phrase_counts = phrase_counts[phrase_counts['sentiment_label'] == selected_sentiment]
+    
+    # Frequencies per label in one grouping pass, fed straight to the word clouds
+    phrase_frequencies = {
+        label: dict(zip(group['phrase'], group['count']))
+        for label, group in phrase_counts.groupby('sentiment_label')
+    }
+    
     col1, col2, col3 = st.columns(3)
     
     with col1:
         st.markdown("**Positive Comments**")
-        positive_df = filtered_df[filtered_df['sentiment_label'] == 'positive']
-        positive_phrases = extract_all_phrases(positive_df)
-        fig_wc_pos = create_wordcloud(positive_phrases, 'Positive Phrases', 'Greens')
-        if fig_wc_pos:
-            st.pyplot(fig_wc_pos)
+        wc_pos = create_wordcloud(phrase_frequencies.get('positive'), 'Greens')
+        if wc_pos is not None:
+            st.image(wc_pos, caption='Positive Phrases', use_column_width=True)
         else:
             st.info("No phrases available")
     
     with col2:
         st.markdown("**Neutral Comments**")
-        neutral_df = filtered_df[filtered_df['sentiment_label'] == 'neutral']
-        neutral_phrases = extract_all_phrases(neutral_df)
-        fig_wc_neu = create_wordcloud(neutral_phrases, 'Neutral Phrases', 'Blues')
-        if fig_wc_neu:
-            st.pyplot(fig_wc_neu)
+        wc_neu = create_wordcloud(phrase_frequencies.get('neutral'), 'Blues')
+        if wc_neu is not None:
+            st.image(wc_neu, caption='Neutral Phrases', use_column_width=True)
         else:
             st.info("No phrases available")
     
     with col3:
         st.markdown("**Negative Comments**")
-        negative_df = filtered_df[filtered_df['sentiment_label'] == 'negative']
-        negative_phrases = extract_all_phrases(negative_df)
-        fig_wc_neg = create_wordcloud(negative_phrases, 'Negative Phrases', 'Reds')
-        if fig_wc_neg:
-            st.pyplot(fig_wc_neg)
+        wc_neg = create_wordcloud(phrase_frequencies.get('negative'), 'Reds')
+        if wc_neg is not None:
+            st.image(wc_neg, caption='Negative Phrases', use_column_width=True)
         else:
             st.info("No phrases available")
     
@@ -279,15 +427,8 @@ def main():
     st.markdown("---")
     st.subheader("📈 3. Sentiment Over Time")
     
-    # Group by date
-    timeline_df = filtered_df.copy()
-    timeline_df['date'] = timeline_df['published_at'].dt.date
-    
-    # Filter to start from July 1st, 2025 (tracking recent comments)
-    start_date = pd.to_datetime('2025-07-01').date()
-    timeline_df = timeline_df[timeline_df['date'] >= start_date]
-    
-    timeline_sentiment = timeline_df.groupby(['date', 'sentiment_label']).size().reset_index(name='count')
+    # Daily counts from July 1st, 2025 (tracking recent comments)
+    timeline_sentiment = load_sentiment_timeline(selected_category, selected_sentiment)
     
     fig3 = px.line(
         timeline_sentiment,
@@ -306,11 +447,13 @@ def main():
     st.markdown("---")
     st.subheader("🔤 4. Most Common Phrases")
     
-    all_phrases = extract_all_phrases(filtered_df)
-    if all_phrases:
-        from collections import Counter
-        phrase_counts = Counter(all_phrases).most_common(20)
-        phrase_df = pd.DataFrame(phrase_counts, columns=['Phrase', 'Count'])
+    if not phrase_counts.empty:
+        phrase_df = (
+            phrase_counts.groupby('phrase')['count'].sum()
+            .nlargest(20)
+            .reset_index()
+        )
+        phrase_df.columns = ['Phrase', 'Count']
         
         fig4 = px.bar(
             phrase_df,
@@ -335,27 +478,16 @@ def main():
     # Load actual video titles from JSON files
     video_titles = load_video_titles()
     
-    video_counts = filtered_df.groupby('video_id').agg({
-        'comment_id': 'count',
-        'sentiment_score': 'mean',
-        'category': 'first'
-    }).reset_index()
-    video_counts.columns = ['video_id', 'comment_count', 'avg_sentiment', 'category']
-    video_counts = video_counts.sort_values('comment_count', ascending=False)
-    
     # Limit to top 12 videos for better readability
-    video_counts = video_counts.head(12)
+    video_counts = load_top_videos(selected_category, selected_sentiment, limit=12)
     
     # Add video titles with truncation for display
     video_counts['video_title_full'] = video_counts['video_id'].map(video_titles).fillna(video_counts['video_id'])
     
-    # Truncate long titles for display (show full in hover)
-    def truncate_title(title, max_length=60):
-        if len(title) <= max_length:
-            return title
-        return title[:max_length].rsplit(' ', 1)[0] + '...'
-    
-    video_counts['video_title_short'] = video_counts['video_title_full'].apply(truncate_title)
+    # Truncate long titles at a word boundary for display (show full in hover)
+    titles = video_counts['video_title_full']
+    truncated = titles.str.slice(0, 60).str.rsplit(' ', n=1).str[0] + '...'
+    video_counts['video_title_short'] = titles.where(titles.str.len() <= 60, truncated)
     
     # Sort by comment_count for horizontal bar chart (ascending so highest is on top)
     video_counts = video_counts.sort_values('comment_count', ascending=True)
@@ -395,7 +527,7 @@ def main():
     st.plotly_chart(fig5, use_container_width=True)
     
     # Show total count info
-    total_videos = len(filtered_df['video_id'].unique())
+    total_videos = metrics['total_videos']
     if total_videos > 12:
         st.caption(f"📊 Showing top 12 of {total_videos} total videos (hover bars for full details)")
     
@@ -407,24 +539,26 @@ def main():
     
     with col1:
         st.markdown("**Sentiment Distribution**")
-        sentiment_dist = filtered_df['sentiment_label'].value_counts()
+        sentiment_dist = load_sentiment_distribution(selected_category, selected_sentiment)
         fig_pie = px.pie(
-            values=sentiment_dist.values,
-            names=sentiment_dist.index,
+            sentiment_dist,
+            values='count',
+            names='sentiment_label',
             title='Overall Sentiment Distribution',
-            color=sentiment_dist.index,
+            color='sentiment_label',
             color_discrete_map={'positive': '#2ecc71', 'neutral': '#95a5a6', 'negative': '#e74c3c'}
         )
         st.plotly_chart(fig_pie, use_container_width=True)
     
     with col2:
         st.markdown("**Category Distribution**")
-        # Use unfiltered df to show all categories
-        category_dist = df['category'].value_counts()
+        # Ignore sidebar filters to show all categories
+        category_dist = load_category_distribution()
         if not category_dist.empty:
             fig_pie2 = px.pie(
-                values=category_dist.values,
-                names=category_dist.index,
+                category_dist,
+                values='count',
+                names='category',
                 title='Comments by Category'
             )
             st.plotly_chart(fig_pie2, use_container_width=True)
@@ -435,11 +569,6 @@ def main():
     st.markdown("---")
     st.markdown(f"**Last updated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     st.markdown("**Data Source:** YouTube Data API v3 | **Analysis:** VADER Sentiment + RAKE Phrase Extraction | **Storage:** DuckDB")
-    
-    # Auto-refresh logic
-    if auto_refresh:
-        time.sleep(30)
-        st.rerun()
 
 if __name__ == "__main__":
     main()
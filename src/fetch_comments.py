@@ -6,21 +6,144 @@ Subsequent runs: Only fetches new comments since last run
 """
 
 import os
-import json
+import orjson
+import ijson
 import yaml
-import time
 import socket
+import threading
+from functools import lru_cache
 from pathlib import Path
-from datetime import datetime, timezone
+from operator import itemgetter
+from datetime import datetime, timezone, timedelta
 from typing import List, Dict, Optional
 from prefect import task, get_run_logger
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.discovery_cache import get_static_doc
 from googleapiclient.errors import HttpError
+from googleapiclient.model import JsonModel
 from confluent_kafka import Producer
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# libyaml's C parser when PyYAML was built with it, else the pure-Python one
+try:
+    from yaml import CSafeLoader as YamlSafeLoader
+except ImportError:
+    from yaml import SafeLoader as YamlSafeLoader
+
+# googleapiclient retries 429/5xx (and rate-limit 403s) with exponential backoff
+API_NUM_RETRIES = 5
+
+# Server-side response mask: only the thread fields we actually store
+COMMENT_THREAD_FIELDS = (
+    'nextPageToken,'
+    'items(id,snippet/totalReplyCount,'
+    'snippet/topLevelComment/snippet(authorDisplayName,textDisplay,likeCount,publishedAt))'
+)
+VIDEO_FIELDS = 'items(snippet(title,channelTitle),statistics/commentCount)'
+VIDEO_BATCH_FIELDS = 'items(id,snippet(title,channelTitle),statistics/commentCount)'
+VIDEOS_PER_REQUEST = 50
+
+# Accessors for the nested thread item, built once instead of per comment
+_thread_fields = itemgetter('id', 'snippet')
+_thread_snippet_fields = itemgetter('topLevelComment', 'totalReplyCount')
+_comment_snippet = itemgetter('snippet')
+_comment_fields = itemgetter('authorDisplayName', 'textDisplay', 'likeCount', 'publishedAt')
+
+# Titles and channel names rarely change; reuse the saved header until it's this old.
+# Also bounds how long an unchanged commentCount may skip a video's comment fetch.
+VIDEO_INFO_MAX_AGE = timedelta(days=7)
+
+_thread_local = threading.local()
+
+# produce() tries per message while the local queue stays full, with a 0.5 s
+# poll between tries to let librdkafka drain delivered batches
+KAFKA_PRODUCE_ATTEMPTS = 5
+
+_kafka_producer = None
+_kafka_producer_lock = threading.Lock()
+
+@lru_cache(maxsize=None)
+def _youtube_discovery_doc() -> Optional[Dict]:
+    """
+    Parse the discovery document bundled with google-api-python-client once
+    per process. Every per-thread client is built from this same dict rather
+    than re-reading and re-parsing the ~500 KB JSON for each thread.
+    """
+    doc = get_static_doc('youtube', 'v3')
+    return orjson.loads(doc) if doc else None
+
+class OrjsonModel(JsonModel):
+    """JsonModel that decodes API responses with orjson instead of stdlib json."""
+    
+    def deserialize(self, content):
+        try:
+            body = orjson.loads(content)
+        except orjson.JSONDecodeError:
+            # Same as JsonModel: hand back non-JSON bodies (e.g. proxy errors) as text
+            return content.decode('utf-8') if isinstance(content, bytes) else content
+        if self._data_wrapper and 'data' in body:
+            body = body['data']
+        return body
+
+def get_youtube_client(api_key: str):
+    """
+    Return the calling thread's YouTube client, building it on first use.
+    Clients aren't thread-safe, but reusing one per worker thread keeps its
+    HTTPS connection alive across videos instead of reconnecting per video.
+    """
+    clients = getattr(_thread_local, 'youtube_clients', None)
+    if clients is None:
+        clients = _thread_local.youtube_clients = {}
+    
+    if api_key not in clients:
+        discovery_doc = _youtube_discovery_doc()
+        if discovery_doc is not None:
+            clients[api_key] = build_from_document(discovery_doc, developerKey=api_key, model=OrjsonModel())
+        else:
+            clients[api_key] = build('youtube', 'v3', developerKey=api_key, model=OrjsonModel())
+    return clients[api_key]
+
+def get_kafka_producer() -> Producer:
+    """
+    Return the process-wide Kafka producer, creating it on first use.
+    librdkafka producers are thread-safe, so every fetch task shares one
+    connection and batch queue instead of opening and flushing its own.
+    """
+    global _kafka_producer
+    
+    with _kafka_producer_lock:
+        if _kafka_producer is None:
+            # Bulk historical fetches push thousands of small JSON messages:
+            # linger and large batches let librdkafka fold them into few
+            # compressed ProduceRequests. acks=1 is enough since every
+            # comment is also persisted to the raw JSONL file. murmur2
+            # matches the Java client's key-to-partition mapping.
+            _kafka_producer = Producer({
+                'bootstrap.servers': 'localhost:9092',
+                'client.id': socket.gethostname(),
+                'acks': '1',
+                'enable.idempotence': False,
+                'message.send.max.retries': 3,
+                'linger.ms': 50,
+                'batch.num.messages': 10000,
+                'batch.size': 262144,
+                'queue.buffering.max.messages': 200000,
+                'queue.buffering.max.kbytes': 1048576,
+                'compression.type': 'lz4',
+                'compression.level': 6,
+                'partitioner': 'murmur2'
+            })
+        return _kafka_producer
+
+def _reported_comment_count(video_info: Optional[Dict]) -> Optional[int]:
+    """commentCount from a videos.list item, or None if absent (cached header, comments off)."""
+    if not video_info:
+        return None
+    count = video_info.get('statistics', {}).get('commentCount')
+    return int(count) if count is not None else None
+
 class CommentFetcher:
     """Fetch YouTube comments with Kafka streaming."""
     
@@ -32,7 +155,6 @@ class CommentFetcher:
             self.logger = logging.getLogger("CommentFetcher")
 
         self.api_key = api_key
-        self.youtube = build('youtube', 'v3', developerKey=api_key)
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(parents=True, exist_ok=True)
         
@@ -41,126 +163,401 @@ class CommentFetcher:
         
         if enable_kafka:
             try:
-                self.kafka_producer = Producer({
-                    'bootstrap.servers': 'localhost:9092',
-                    'client.id': socket.gethostname(),
-                    'acks': 'all',
-                    'retries': 3
-                })
+                self.kafka_producer = get_kafka_producer()
             except Exception as e:
                 self.logger.warning(f"Failed to initialize Kafka: {e}. Continuing without streaming.")
                 self.enable_kafka = False
     
-    def send_to_kafka(self, comment_data: Dict, topic: str = 'raw_comments'):
-        """Stream comment to Kafka topic."""
-        if not self.enable_kafka or not self.kafka_producer:
+    @property
+    def youtube(self):
+        """Resolve the client per call so a fetcher never shares one across threads."""
+        return get_youtube_client(self.api_key)
+    
+    def send_batch_to_kafka(self, comments: List[Dict], topic: str = 'raw_comments'):
+        """
+        Stream a page of comments to Kafka in one tight produce loop, then
+        serve delivery callbacks once for the whole page.
+        """
+        if not self.enable_kafka or not self.kafka_producer or not comments:
             return
         
-        try:
-            self.kafka_producer.produce(
-                topic,
-                key=comment_data['comment_id'].encode('utf-8'),
-                value=json.dumps(comment_data).encode('utf-8')
-            )
-            self.kafka_producer.poll(0)
-        except Exception as e:
-            self.logger.error(f"Kafka send error: {e}")
+        produce = self.kafka_producer.produce
+        
+        for comment_data in comments:
+            # Keyed by video so each video's comments share a partition and
+            # downstream consumers can batch per video
+            key = comment_data['video_id'].encode('ascii')
+            value = orjson.dumps(comment_data)
+            
+            # A failure loses only this message; the rest of the page still goes out
+            try:
+                for attempt in range(KAFKA_PRODUCE_ATTEMPTS):
+                    try:
+                        produce(topic, key=key, value=value)
+                        break
+                    except BufferError:
+                        if attempt == KAFKA_PRODUCE_ATTEMPTS - 1:
+                            raise
+                        # Local queue is full: serve delivery callbacks to free space, then retry
+                        self.kafka_producer.poll(0.5)
+            except Exception as e:
+                self.logger.error(f"Kafka send error for {comment_data['comment_id']}: {e}")
+        
+        self.kafka_producer.poll(0)
+    
+    def _comments_path(self, video_id: str) -> Path:
+        return self.data_dir / f"{video_id}.jsonl"
+    
+    def _meta_path(self, video_id: str) -> Path:
+        return self.data_dir / f"{video_id}.meta.json"
+    
+    def _write_meta(self, video_id: str, meta: Dict):
+        """Replace the .meta.json header atomically so readers never see a truncated one."""
+        meta_file = self._meta_path(video_id)
+        tmp_file = meta_file.with_name(meta_file.name + '.tmp')
+        with open(tmp_file, 'wb') as f:
+            f.write(orjson.dumps(meta, option=orjson.OPT_INDENT_2))
+        os.replace(tmp_file, meta_file)
+    
+    def _truncate_partial_line(self, jsonl_file: Path):
+        """
+        Cut an unterminated last line left by an interrupted append, so the
+        next append starts on a fresh line instead of gluing onto it.
+        """
+        with open(jsonl_file, 'r+b') as f:
+            end = f.seek(0, os.SEEK_END)
+            if end == 0:
+                return
+            f.seek(end - 1)
+            if f.read(1) == b'\n':
+                return
+            
+            # Scan back for the last complete line, 64 KB at a time
+            keep = 0
+            pos = end
+            while pos > 0:
+                start = max(0, pos - 65536)
+                f.seek(start)
+                newline = f.read(pos - start).rfind(b'\n')
+                if newline != -1:
+                    keep = start + newline + 1
+                    break
+                pos = start
+            f.truncate(keep)
+        
+        self.logger.warning(f"Dropped {end - keep} bytes of partial trailing line from {jsonl_file}")
     
-    def get_existing_comments(self, video_id: str) -> tuple[List[Dict], set]:
-        """Load existing comments and return list + set of IDs for fast lookup."""
-        json_file = self.data_dir / f"{video_id}.json"
+    def migrate_legacy_snapshot(self, video_id: str):
+        """
+        Convert an old single-document {video_id}.json snapshot into the
+        append-only {video_id}.jsonl + {video_id}.meta.json layout.
+        Comments are streamed across one at a time with ijson.
+        """
+        legacy_file = self.data_dir / f"{video_id}.json"
+        jsonl_file = self._comments_path(video_id)
         
-        if not json_file.exists():
-            return [], set()
+        if not legacy_file.exists() or jsonl_file.exists():
+            return
         
         try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                comments = data.get('comments', [])
-                existing_ids = {c['comment_id'] for c in comments}
-                return comments, existing_ids
+            total = 0
+            # Large write buffer: one line per comment would otherwise mean
+            # a syscall every few KB on big histories
+            with open(legacy_file, 'rb') as src, open(jsonl_file, 'wb', buffering=1 << 20) as dst:
+                for comment in ijson.items(src, 'comments.item', use_float=True):
+                    dst.write(orjson.dumps(comment) + b'\n')
+                    total += 1
+            
+            # Header scalars precede the comments array in legacy files
+            header = {}
+            with open(legacy_file, 'rb') as src:
+                for prefix, event, value in ijson.parse(src):
+                    if prefix == 'comments':
+                        break
+                    if event in ('string', 'number', 'null') and '.' not in prefix:
+                        header[prefix] = value
+            header['total_comments'] = total
+            
+            self._write_meta(video_id, header)
         except Exception as e:
-            self.logger.error(f"Error loading {json_file}: {e}")
-            return [], set()
+            self.logger.error(f"Error migrating {legacy_file}: {e}")
+            jsonl_file.unlink(missing_ok=True)
+            return
+        
+        legacy_file.unlink()
+        self.logger.info(f"Migrated {legacy_file} to JSONL ({total} comments).")
     
-    def fetch_video_comments(self, video_id: str, category: str = None) -> Dict:
+    def get_existing_ids(self, video_id: str) -> set:
         """
-        Fetch comments for a video. Handles incremental logic internally.
+        Collect the comment IDs already on disk, one JSONL line at a time.
+        Fetching only needs IDs for dedup, so the comments are never kept.
         """
-        existing_comments, existing_ids = self.get_existing_comments(video_id)
-        self.logger.info(f"Fetching video: {video_id} | Existing comments: {len(existing_ids)}")
+        self.migrate_legacy_snapshot(video_id)
+        jsonl_file = self._comments_path(video_id)
         
-        try:
-            video_response = self.youtube.videos().list(
-                part='snippet,statistics',
-                id=video_id
-            ).execute()
+        if not jsonl_file.exists():
+            return set()
+        
+        existing_ids = set()
+        
+        # An I/O error propagates: guessing "no history" here would re-fetch
+        # and re-append every comment the video already has
+        with open(jsonl_file, 'rb') as f:
+            for line_no, line in enumerate(f, 1):
+                # An unterminated last line is a torn append; it holds no
+                # complete comment and is trimmed before the next append
+                if not line.endswith(b'\n'):
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    existing_ids.add(orjson.loads(line)['comment_id'])
+                except (orjson.JSONDecodeError, KeyError, TypeError) as e:
+                    self.logger.warning(f"Skipping bad line {line_no} in {jsonl_file}: {e}")
+        
+        return existing_ids
+    
+    def iter_comment_pages(self, video_id: str, category: str, existing_ids: set,
+                           page_token: Optional[str] = None, stop_at_seen: bool = True):
+        """
+        Page through a video's comment threads, yielding each page's unseen
+        comments (and the token of the page after it) as soon as it arrives
+        so callers never wait on the full history. Starts at page_token if given.
+        Yielded IDs are added to existing_ids.
+        """
+        is_incremental = stop_at_seen and len(existing_ids) > 0
+        next_page_token = page_token
+        
+        while True:
+            api_params = {
+                'part': 'snippet',
+                'videoId': video_id,
+                'maxResults': 100,
+                'order': 'time',
+                'textFormat': 'plainText',
+                'fields': COMMENT_THREAD_FIELDS
+            }
             
-            if not video_response['items']:
-                return {'success': False, 'error': 'Video not found', 'video_id': video_id}
+            if next_page_token:
+                api_params['pageToken'] = next_page_token
             
-            video_info = video_response['items'][0]
-            video_title = video_info['snippet']['title']
-            channel_title = video_info['snippet']['channelTitle']
+            comments_response = self.youtube.commentThreads().list(**api_params).execute(num_retries=API_NUM_RETRIES)
+            page_comments = []
             
-            is_incremental = len(existing_ids) > 0
-            new_comments = []
-            next_page_token = None
-            consecutive_empty_pages = 0
-            MAX_EMPTY_PAGES = 3
-            
-            while True:
-                api_params = {
-                    'part': 'snippet',
-                    'videoId': video_id,
-                    'maxResults': 100,
-                    'order': 'time',
-                    'textFormat': 'plainText'
-                }
+            for item in comments_response['items']:
+                comment_id, thread_snippet = _thread_fields(item)
                 
-                if next_page_token:
-                    api_params['pageToken'] = next_page_token
+                if comment_id in existing_ids:
+                    continue
+                # Pages can shift while new comments arrive; never store one twice
+                existing_ids.add(comment_id)
                 
-                comments_response = self.youtube.commentThreads().list(**api_params).execute()
-                page_comments = []
+                top_comment, reply_count = _thread_snippet_fields(thread_snippet)
+                author, text, like_count, published_at = _comment_fields(_comment_snippet(top_comment))
                 
-                for item in comments_response['items']:
-                    top_comment = item['snippet']['topLevelComment']['snippet']
-                    comment_id = item['id']
-                    
-                    if comment_id in existing_ids:
-                        continue
-                    
-                    comment_data = {
-                        'comment_id': comment_id,
-                        'video_id': video_id,
-                        'category': category,
-                        'author': top_comment['authorDisplayName'],
-                        'text': top_comment['textDisplay'],
-                        'like_count': top_comment['likeCount'],
-                        'published_at': top_comment['publishedAt'],
-                        'reply_count': item['snippet']['totalReplyCount']
-                    }
-                    
-                    page_comments.append(comment_data)
-                    self.send_to_kafka(comment_data)
-                
-                new_comments.extend(page_comments)
+                comment_data = {
+                    'comment_id': comment_id,
+                    'video_id': video_id,
+                    'category': category,
+                    'author': author,
+                    'text': text,
+                    'like_count': like_count,
+                    'published_at': published_at,
+                    'reply_count': reply_count
+                }
                 
-                if is_incremental:
-                    if not page_comments:
-                        consecutive_empty_pages += 1
-                        if consecutive_empty_pages >= MAX_EMPTY_PAGES:
-                            self.logger.info(f"Stopping early: {MAX_EMPTY_PAGES} empty pages (Incremental mode).")
-                            break
-                    else:
-                        consecutive_empty_pages = 0
+                page_comments.append(comment_data)
+            
+            self.send_batch_to_kafka(page_comments)
+            
+            next_page_token = comments_response.get('nextPageToken')
+            yield page_comments, next_page_token
+            
+            # order='time' pages newest-first, so once a whole page is already
+            # stored every later page is older still and can be skipped
+            if is_incremental and not page_comments:
+                self.logger.info("Stopping early: page fully seen (Incremental mode).")
+                break
+            
+            if not next_page_token:
+                break
+    
+    def append_pages(self, video_id: str, category: str, existing_ids: set, progress: Dict,
+                     page_token: Optional[str] = None, stop_at_seen: bool = True) -> int:
+        """
+        Append each page from iter_comment_pages as it arrives, recording in
+        the header the token to resume from should the fetch stop partway.
+        Returns the number of comments appended.
+        """
+        appended = 0
+        for page_comments, next_page_token in self.iter_comment_pages(
+                video_id, category, existing_ids, page_token=page_token, stop_at_seen=stop_at_seen):
+            self.append_comments(video_id, page_comments)
+            appended += len(page_comments)
+            self._write_meta(video_id, {
+                **progress,
+                'total_comments': len(existing_ids),
+                'resume_page_token': next_page_token
+            })
+        return appended
+
+    def load_meta(self, video_id: str) -> Optional[Dict]:
+        """Return the video's .meta.json header, or None if missing or unreadable."""
+        meta_file = self._meta_path(video_id)
+        
+        if not meta_file.exists():
+            return None
+        
+        try:
+            with open(meta_file, 'rb') as f:
+                return orjson.loads(f.read())
+        except Exception:
+            return None
+    
+    def load_fresh_meta(self, video_id: str) -> Optional[Dict]:
+        """Return the video's .meta.json header if it is younger than VIDEO_INFO_MAX_AGE."""
+        meta = self.load_meta(video_id)
+        
+        if meta is None:
+            return None
+        
+        try:
+            last_updated = datetime.fromisoformat(meta['last_updated'])
+        except Exception:
+            return None
+        
+        if datetime.now(timezone.utc) - last_updated > VIDEO_INFO_MAX_AGE:
+            return None
+        return meta
+    
+    def get_cached_video_info(self, video_id: str) -> Optional[Dict]:
+        """
+        Return the title/channel saved in the video's .meta.json, shaped like a
+        videos.list item, if the header is younger than VIDEO_INFO_MAX_AGE.
+        """
+        meta = self.load_fresh_meta(video_id)
+        
+        if meta is None or not meta.get('video_title'):
+            return None
+        
+        return {
+            'id': video_id,
+            'snippet': {'title': meta['video_title'], 'channelTitle': meta.get('channel_title')}
+        }
+    
+    def fetch_videos_metadata(self, video_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Look up video snippets and comment counts in batches of 50 IDs (the
+        API maximum), one videos.list call per batch at the quota cost of a
+        single video. The fresh counts are what lets unchanged videos skip
+        their comment fetch, so every ID is queried even if its header is cached.
+        Returns {video_id: item}; IDs the API doesn't return are omitted.
+        """
+        metadata = {}
+        
+        for start in range(0, len(video_ids), VIDEOS_PER_REQUEST):
+            chunk = video_ids[start:start + VIDEOS_PER_REQUEST]
+            response = self.youtube.videos().list(
+                part='snippet,statistics',
+                id=','.join(chunk),
+                fields=VIDEO_BATCH_FIELDS,
+                maxResults=VIDEOS_PER_REQUEST
+            ).execute(num_retries=API_NUM_RETRIES)
+            
+            for item in response.get('items', []):
+                metadata[item['id']] = item
+        
+        return metadata
+
+    def fetch_video_comments(self, video_id: str, category: str = None, video_info: Optional[Dict] = None) -> Dict:
+        """
+        Fetch comments for a video. Handles incremental logic internally.
+        Pass video_info (an item from fetch_videos_metadata) to skip the
+        per-video videos.list lookup; otherwise a fresh cached header is used.
+        If video_info's commentCount matches the one recorded at the last
+        fetch, the comment threads aren't traversed at all.
+        
+        Pages are appended as they arrive, newest first, so an interrupted
+        fetch leaves a gap between the pages it stored and the older history.
+        The header marks the fetch incomplete until save_result; the next run
+        then resumes from the saved page token before anything may stop early.
+        """
+        reported_count = _reported_comment_count(video_info)
+        
+        previous_meta = self.load_meta(video_id)
+        interrupted = previous_meta is not None and previous_meta.get('fetch_complete') is False
+        
+        if reported_count is not None and not interrupted:
+            meta = self.load_fresh_meta(video_id)
+            if meta is not None and meta.get('reported_comment_count') == reported_count:
+                self.logger.info(f"Skipping video: {video_id} | commentCount unchanged ({reported_count})")
+                return {
+                    'success': True,
+                    'video_id': video_id,
+                    'video_title': video_info['snippet']['title'],
+                    'channel_title': video_info['snippet']['channelTitle'],
+                    'category': category,
+                    'new_count': 0,
+                    'existing_count': meta.get('total_comments', 0),
+                    'reported_comment_count': reported_count
+                }
+        
+        existing_ids = self.get_existing_ids(video_id)
+        existing_count = len(existing_ids)
+        self.logger.info(f"Fetching video: {video_id} | Existing comments: {existing_count}")
+        
+        try:
+            if video_info is None:
+                video_info = self.get_cached_video_info(video_id)
+            
+            if video_info is None:
+                video_response = self.youtube.videos().list(
+                    part='snippet,statistics',
+                    id=video_id,
+                    fields=VIDEO_FIELDS
+                ).execute(num_retries=API_NUM_RETRIES)
                 
-                next_page_token = comments_response.get('nextPageToken')
-                if not next_page_token:
-                    break
+                if not video_response['items']:
+                    return {'success': False, 'error': 'Video not found', 'video_id': video_id}
                 
-                time.sleep(0.2) 
+                video_info = video_response['items'][0]
+                reported_count = _reported_comment_count(video_info)
+            
+            video_title = video_info['snippet']['title']
+            channel_title = video_info['snippet']['channelTitle']
+            
+            # Mark the fetch in progress before the first page is appended
+            progress = {
+                **(previous_meta or {}),
+                'video_id': video_id,
+                'video_title': video_title,
+                'channel_title': channel_title,
+                'category': category,
+                'total_comments': existing_count,
+                'fetch_complete': False
+            }
+            resume_token = previous_meta.get('resume_page_token') if interrupted else None
+            self._write_meta(video_id, {**progress, 'resume_page_token': resume_token})
+            
+            # Each page goes to disk as it arrives, so memory stays at one page
+            new_count = 0
+            stop_at_seen = True
+            if resume_token:
+                # Fill the gap first: it ends at the stored history (a fully
+                # seen page) or at the last page
+                self.logger.info(f"Resuming interrupted fetch for {video_id}")
+                try:
+                    new_count += self.append_pages(video_id, category, existing_ids, progress, page_token=resume_token)
+                except HttpError as e:
+                    if e.resp.status != 400:
+                        raise
+                    # Expired page token: walk every page instead, deduping by ID
+                    self.logger.warning(f"Resume token rejected for {video_id}; re-scanning all pages.")
+                    stop_at_seen = False
+                self._write_meta(video_id, {**progress, 'total_comments': len(existing_ids), 'resume_page_token': None})
+            
+            # Then the comments posted since, newest first down to the stored history
+            new_count += self.append_pages(video_id, category, existing_ids, progress, stop_at_seen=stop_at_seen)
             
             return {
                 'success': True,
@@ -168,51 +565,98 @@ class CommentFetcher:
                 'video_title': video_title,
                 'channel_title': channel_title,
                 'category': category,
-                'new_comments': new_comments,
-                'existing_comments': existing_comments
+                'new_count': new_count,
+                'existing_count': existing_count,
+                'reported_comment_count': reported_count
             }
         
         except HttpError as e:
             if e.resp.status == 403:
                 self.logger.error(f"Quota exceeded or disabled for {video_id}")
                 return {'success': False, 'error': 'Quota/Disabled', 'video_id': video_id}
+            if e.resp.status == 404:
+                # e.g. deleted since its title was cached
+                self.logger.error(f"Video not found: {video_id}")
+                return {'success': False, 'error': 'Video not found', 'video_id': video_id}
             raise e
         except Exception as e:
             self.logger.error(f"Error fetching {video_id}: {e}")
             return {'success': False, 'error': str(e), 'video_id': video_id}
 
+    def append_comments(self, video_id: str, comments: List[Dict]):
+        """
+        Append one page of new comments to the video's JSONL file.
+        Bytes written are proportional to the new comments, not the history;
+        duplicates never reach the file because fetching skips known IDs.
+        """
+        if not comments:
+            return
+        
+        jsonl_file = self._comments_path(video_id)
+        if jsonl_file.exists():
+            self._truncate_partial_line(jsonl_file)
+        
+        # Each page is appended oldest-first; the API pages newest-first
+        new_sorted = sorted(comments, key=itemgetter('published_at'))
+        with open(jsonl_file, 'ab') as f:
+            f.write(b''.join(orjson.dumps(c) + b'\n' for c in new_sorted))
+    
     def save_result(self, result: Dict):
-        """Merges new comments with existing ones and saves to disk."""
+        """
+        Refresh the video's header once its pages have been appended.
+        Returns the JSONL path, or None if the fetch failed.
+        """
         if not result['success']:
             return None
             
         video_id = result['video_id']
-        new_comments = result['new_comments']
-        existing_comments = result.get('existing_comments', [])
+        new_count = result['new_count']
+        jsonl_file = self._comments_path(video_id)
         
-        all_comments = existing_comments + new_comments
-        final_comments = sorted(all_comments, key=lambda x: x['published_at'])
+        reported_count = result.get('reported_comment_count')
         
-        output_data = {
+        # Nothing appended: keep last_updated (and the rest of the header),
+        # unless commentCount moved (e.g. new replies) and must be recorded;
+        # only the in-progress mark the fetch set is cleared
+        if not new_count and jsonl_file.exists():
+            meta = self.load_meta(video_id)
+            fresh_meta = self.load_fresh_meta(video_id)
+            if meta is not None and (reported_count is None or (fresh_meta is not None and meta.get('reported_comment_count') == reported_count)):
+                if meta.get('fetch_complete') is False:
+                    self._write_meta(video_id, {**meta, 'fetch_complete': True, 'resume_page_token': None})
+                self.logger.info(f"No new comments for {video_id}; snapshot unchanged.")
+                return str(jsonl_file)
+        
+        # A video with no comments yet still gets a file for ingest to open
+        jsonl_file.touch()
+        
+        # video_info from the cached header carries no statistics; keep the
+        # count recorded earlier rather than disabling the unchanged-count skip
+        if reported_count is None:
+            previous = self.load_meta(video_id)
+            if previous is not None:
+                reported_count = previous.get('reported_comment_count')
+        
+        meta = {
             'video_id': video_id,
             'video_title': result.get('video_title'),
             'channel_title': result.get('channel_title'),
             'category': result.get('category'),
-            'total_comments': len(final_comments),
-            'last_updated': datetime.now(timezone.utc).isoformat(),
-            'comments': final_comments
+            'total_comments': result.get('existing_count', 0) + new_count,
+            'reported_comment_count': reported_count,
+            'fetch_complete': True,
+            'resume_page_token': None,
+            'last_updated': datetime.now(timezone.utc).isoformat(timespec='seconds')
         }
         
-        json_file = self.data_dir / f"{video_id}.json"
-        with open(json_file, 'w', encoding='utf-8') as f:
-            json.dump(output_data, f, indent=2, ensure_ascii=False)
+        self._write_meta(video_id, meta)
         
-        self.logger.info(f"Saved {video_id}: {len(new_comments)} new comments.")
-        return str(json_file)
+        self.logger.info(f"Saved {video_id}: {new_count} new comments.")
+        return str(jsonl_file)
 
     def close(self):
-        if self.kafka_producer:
-            self.kafka_producer.flush(timeout=5)
+        # The producer is shared across tasks; flush_kafka_task drains it once per flow
+        self.kafka_producer = None
 
 
 @task(name="Load Video Config", tags=["config"])
@@ -229,13 +673,29 @@ def load_videos_config() -> Dict:
         raise FileNotFoundError(f"Config file not found at: {config_path}")
 
     with open(config_path, 'r') as f:
-        return yaml.safe_load(f)
+        return yaml.load(f, Loader=YamlSafeLoader)
+
+@task(name="Fetch Video Metadata", retries=2, retry_delay_seconds=10)
+def fetch_videos_metadata_task(video_entries: List[Dict], api_key: str) -> Optional[Dict[str, Dict]]:
+    """
+    Batch-fetch snippets and comment counts for the given videos in one call per 50 IDs.
+    An ID missing from the result was not found. On failure returns None so
+    each video falls back to its own lookup.
+    """
+    fetcher = CommentFetcher(api_key=api_key, enable_kafka=False)
+    video_ids = [entry['video_id'] for entry in video_entries]
+    
+    try:
+        return fetcher.fetch_videos_metadata(video_ids)
+    except HttpError as e:
+        fetcher.logger.warning(f"Batch metadata lookup failed ({e}); falling back to per-video lookups.")
+        return None
 
 @task(name="Fetch Video", retries=2, retry_delay_seconds=10)
-def fetch_and_save_video_task(video_entry: Dict, category: str, api_key: str):
+def fetch_and_save_video_task(video_entry: Dict, category: str, api_key: str, video_info: Optional[Dict] = None):
     """
     Atomic task to fetch and save comments for ONE video.
-    Returns the path to the saved JSON file.
+    Returns the path to the saved JSONL file.
     """
     video_id = video_entry['video_id']
     
@@ -243,8 +703,22 @@ def fetch_and_save_video_task(video_entry: Dict, category: str, api_key: str):
     fetcher = CommentFetcher(api_key=api_key, enable_kafka=True)
     
     try:
-        result = fetcher.fetch_video_comments(video_id, category=category)
+        result = fetcher.fetch_video_comments(video_id, category=category, video_info=video_info)
         file_path = fetcher.save_result(result)
         return file_path
     finally:
-        fetcher.close()
\ No newline at end of file
+        fetcher.close()
+
+@task(name="Flush Kafka Producer", tags=["kafka"])
+def flush_kafka_task(timeout: float = 10.0) -> int:
+    """
+    Deliver everything the shared producer still has queued.
+    Returns the number of messages left undelivered.
+    """
+    if _kafka_producer is None:
+        return 0
+    
+    remaining = _kafka_producer.flush(timeout=timeout)
+    if remaining:
+        get_run_logger().warning(f"{remaining} Kafka messages not delivered before timeout.")
+    return remaining
\ No newline at end of file
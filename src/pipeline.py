@@ -1,12 +1,19 @@
 import os
+from collections import deque
 from prefect import flow, task
+from prefect.task_runners import ConcurrentTaskRunner
 from dotenv import load_dotenv
-from fetch_comments import load_videos_config, fetch_and_save_video_task
-from process_comments import process_file_to_duckdb
+from fetch_comments import load_videos_config, fetch_videos_metadata_task, fetch_and_save_video_task, flush_kafka_task
+from process_comments import process_file_to_duckdb, export_comments_parquet
 from sentiment_analysis import analyze_video_sentiment
 
 load_dotenv()
 
+# Upper bound on fetch tasks in flight at once. Fetching is network-bound
+# and videos are independent, so they overlap; DuckDB writes stay serial.
+# Past ~8 videos the gain flattens out against API latency and quota.
+MAX_CONCURRENT_FETCHES = 8
+
 @task(name="Generate Summary Report")
 def print_summary(results: list):
     """
@@ -38,7 +45,7 @@ def print_summary(results: list):
     print(f"Total Comments Analyzed in this run: {total_processed}")
     print("="*60 + "\n")
 
-@flow(name="Humanoid Sentiment Pipeline", log_prints=True)
+@flow(name="Humanoid Sentiment Pipeline", log_prints=True, task_runner=ConcurrentTaskRunner())
 def main_flow():
     # 1. Load Config
     config = load_videos_config()
@@ -48,29 +55,57 @@ def main_flow():
         raise ValueError("YOUTUBE_API_KEY is missing!")
 
     results = []
+    in_flight = deque()
 
-    # 2. Loop through categories and videos
-    for category, videos in config['categories'].items():
-        print(f"Processing Category: {category}")
+    def ingest_and_analyze(fetch_future):
+        # Fetch and Save Comments (Returns JSONL file path)
+        json_path = fetch_future.result()
         
-        for video_entry in videos:
-            
-            # Fetch and Save Comments (Returns JSON file path)
-            json_path = fetch_and_save_video_task(video_entry, category, api_key)
-            
-            # If fetch failed or no file saved, skip
-            if not json_path:
-                continue
+        # If fetch failed or no file saved, skip
+        if not json_path:
+            return
+
+        # Ingest to DuckDB (Returns video_id)
+        video_id = process_file_to_duckdb(json_path)
+        
+        # Analyze (Returns stats)
+        if video_id:
+            analysis_result = analyze_video_sentiment(video_id)
+            results.append(analysis_result)
+
+    # One videos.list call per 50 videos across every category, instead of one per video
+    all_videos = [entry for videos in config['categories'].values() for entry in videos]
+    metadata = fetch_videos_metadata_task(all_videos, api_key)
 
-            # Ingest to DuckDB (Returns video_id)
-            video_id = process_file_to_duckdb(json_path)
+    try:
+        # 2. Loop through categories and videos, fetching concurrently
+        for category, videos in config['categories'].items():
+            print(f"Processing Category: {category}")
             
-            # Analyze (Returns stats)
-            if video_id:
-                analysis_result = analyze_video_sentiment(video_id)
-                results.append(analysis_result)
+            for video_entry in videos:
+                video_info = metadata.get(video_entry['video_id']) if metadata is not None else None
+                # The batch lookup succeeded without it: deleted or private
+                if metadata is not None and video_info is None:
+                    print(f"Skipping video: {video_entry['video_id']} | Video not found")
+                    continue
+                
+                if len(in_flight) >= MAX_CONCURRENT_FETCHES:
+                    ingest_and_analyze(in_flight.popleft())
+                in_flight.append(fetch_and_save_video_task.submit(video_entry, category, api_key, video_info))
+
+        while in_flight:
+            ingest_and_analyze(in_flight.popleft())
+    finally:
+        # On failure, let fetches still running finish queueing their messages
+        for fetch_future in in_flight:
+            fetch_future.wait()
+        # Every fetch shares one producer; drain its queue once, even if a step raised
+        flush_kafka_task()
+
+    # 3. Columnar snapshot for downstream analysis
+    export_comments_parquet()
 
-    # 3. Final Report
+    # 4. Final Report
     print_summary(results)
 
 if __name__ == "__main__":
@@ -10,9 +10,11 @@ from YouTube API. This is a core streaming architecture pattern.
 """
 
 import sys
-import json
+import orjson
 import logging
 import duckdb
+import pandas as pd
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime, timezone
 from typing import Dict, List
@@ -27,6 +29,15 @@ def init_duckdb(db_path: str):
     
     conn = duckdb.connect(db_path)
     
+    # Three possible labels: stored as a 1-byte ENUM rather than VARCHAR.
+    # Databases created before this keep their VARCHAR column; DuckDB can't
+    # ALTER a column type while the primary-key index depends on the table.
+    has_sentiment_type = conn.execute(
+        "SELECT COUNT(*) FROM duckdb_types() WHERE type_name = 'sentiment'"
+    ).fetchone()[0]
+    if not has_sentiment_type:
+        conn.execute("CREATE TYPE sentiment AS ENUM ('negative', 'neutral', 'positive')")
+    
     # Create schema - ADDED 'phrases JSON' here
     conn.execute("""
         CREATE TABLE IF NOT EXISTS comments (
@@ -41,28 +52,106 @@ def init_duckdb(db_path: str):
             published_at TIMESTAMP,
             updated_at TIMESTAMP,
             processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            sentiment_label VARCHAR,
+            sentiment_label sentiment,
             sentiment_score FLOAT,
             phrases JSON,
             ingested_at TIMESTAMP
         )
     """)
+    
+    # Every analysis and summary query filters on a single video; sentiment_label
+    # is left out since DuckDB rewrites UPDATEs of indexed columns as delete+insert
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_comments_video_id ON comments (video_id)")
+    
+    # Rollups new to this database are backfilled below from the comments
+    # already analyzed, not left to fill one video per analysis run
+    existing_tables = {
+        row[0] for row in conn.execute(
+            "SELECT table_name FROM duckdb_tables() WHERE schema_name = 'main'"
+        ).fetchall()
+    }
+    
+    # Per-video rollups rebuilt after each analysis run, so the dashboard reads
+    # small pre-aggregated tables instead of grouping every comment per rerun
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS video_stats (
+            video_id VARCHAR NOT NULL,
+            category VARCHAR,
+            sentiment_label VARCHAR,
+            comment_count INTEGER,
+            score_sum DOUBLE
+        )
+    """)
+    
+    # Phrase counts per video/sentiment, so the dashboard never has to unnest
+    # the phrases JSON of every comment
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS phrase_stats (
+            video_id VARCHAR NOT NULL,
+            category VARCHAR,
+            sentiment_label VARCHAR,
+            phrase VARCHAR,
+            count INTEGER
+        )
+    """)
+    
+    if 'video_stats' not in existing_tables:
+        conn.execute("""
+            INSERT INTO video_stats
+            SELECT video_id, category, sentiment_label,
+                   COUNT(*) AS comment_count, SUM(sentiment_score) AS score_sum
+            FROM comments
+            WHERE sentiment_label IS NOT NULL
+            GROUP BY ALL
+        """)
+    
+    if 'phrase_stats' not in existing_tables:
+        conn.execute("""
+            INSERT INTO phrase_stats
+            SELECT video_id, category, sentiment_label, phrase, COUNT(*) AS count
+            FROM (
+                SELECT video_id, category, sentiment_label,
+                       UNNEST(from_json(phrases, '["VARCHAR"]')) AS phrase
+                FROM comments
+                WHERE sentiment_label IS NOT NULL
+            )
+            GROUP BY ALL
+        """)
+    
+    # How far into each video's append-only JSONL file has been loaded, so
+    # each run ingests only the lines the fetcher appended since
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ingest_offsets (
+            video_id VARCHAR PRIMARY KEY,
+            bytes_ingested BIGINT
+        )
+    """)
     return conn
 
+@lru_cache(maxsize=8)
+def get_duckdb_connection(db_path: str):
+    """
+    Open db_path and create the schema once per process.
+    Callers take a .cursor() from it: a cheap connection to the same
+    database that can be closed without closing the shared one.
+    """
+    return init_duckdb(db_path)
+
 def clean_text(text: str) -> str:
     """
     Clean comment text for analysis.
     """
     if not text:
         return ""
-    text = text.strip()
-    text = ' '.join(text.split())
-    return text
+    # split() already drops leading/trailing whitespace; in CPython this
+    # split/join is ~3x faster than a \s+ regex substitution
+    return ' '.join(text.split())
 
 @task(name="Ingest to DuckDB", tags=["database"])
 def process_file_to_duckdb(file_path: str, db_path: str = 'data/youtube.duckdb') -> str:
     """
-    Reads a specific JSON file and upserts it into DuckDB.
+    Reads the lines appended to a video's JSONL comments file since the last
+    ingest (plus its .meta.json header) and upserts them into DuckDB.
     Returns the video_id processed.
     """
     logger = get_run_logger()
@@ -73,54 +162,105 @@ def process_file_to_duckdb(file_path: str, db_path: str = 'data/youtube.duckdb')
         return None
 
     try:
-        with open(path_obj, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        with open(path_obj.with_suffix('.meta.json'), 'rb') as f:
+            meta = orjson.loads(f.read())
     except Exception as e:
         logger.error(f"Failed to load JSON {file_path}: {e}")
         return None
         
-    comments = data.get('comments', [])
-    video_id = data.get('video_id')
-    category = data.get('category')
+    video_id = meta.get('video_id')
+    category = meta.get('category')
     
-    if not comments:
-        logger.info(f"No comments to process in {file_path}")
-        return video_id
-
-    conn = init_duckdb(db_path)
-    records_processed = 0
+    conn = get_duckdb_connection(db_path).cursor()
+    # One ingest timestamp for the whole file rather than one per row
+    ingested_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
     
     try:
-        for comment in comments:
-            raw_text = comment.get('text', '')
-            cleaned = clean_text(raw_text)
-            
+        row = conn.execute(
+            "SELECT bytes_ingested FROM ingest_offsets WHERE video_id = ?", [video_id]
+        ).fetchone()
+        offset = row[0] if row else 0
+        
+        try:
+            with open(path_obj, 'rb') as f:
+                # A file shorter than the offset was rewritten (e.g. re-migrated): start over
+                if offset > path_obj.stat().st_size:
+                    offset = 0
+                f.seek(offset)
+                data = f.read()
+            # Only whole lines; a trailing partial line is picked up next run
+            data = data[:data.rfind(b'\n') + 1]
+        except Exception as e:
+            logger.error(f"Failed to load JSON {file_path}: {e}")
+            return None
+        
+        # A corrupt line is skipped rather than failing the file, which would
+        # leave the offset stuck and block every comment appended after it
+        comments = []
+        for line in data.splitlines():
+            if not line.strip():
+                continue
+            try:
+                comments.append(orjson.loads(line))
+            except orjson.JSONDecodeError as e:
+                logger.warning(f"Skipping corrupt line in {file_path}: {e}")
+        
+        if not comments:
+            logger.info(f"No new comments to process in {file_path}")
+            return video_id
+        
+        # Keyed by comment_id so a repeated line keeps only its latest copy:
+        # one upsert statement can't touch the same row twice
+        latest = {comment['comment_id']: comment for comment in comments}
+        raw_texts = [comment.get('text', '') for comment in latest.values()]
+        
+        staging = pd.DataFrame({
+            'comment_id': list(latest),
+            'author': [comment['author'] for comment in latest.values()],
+            'text': raw_texts,
+            'cleaned_text': [clean_text(text) for text in raw_texts],
+            'like_count': [comment['like_count'] for comment in latest.values()],
+            'reply_count': [comment.get('reply_count', 0) for comment in latest.values()],
+            'published_at': [comment['published_at'] for comment in latest.values()],
+            'updated_at': [comment.get('updated_at') for comment in latest.values()]
+        })
+        
+        # One set-based upsert for the whole file instead of one statement per row,
+        # committed together with the offset so a failed ingest is retried in full
+        conn.register('staging_comments', staging)
+        conn.begin()
+        try:
             conn.execute("""
                 INSERT INTO comments (
                     comment_id, video_id, category, author, text, cleaned_text,
                     like_count, reply_count, published_at, updated_at,
                     ingested_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                )
+                SELECT comment_id, ?, ?, author, text, cleaned_text,
+                       like_count, reply_count,
+                       CAST(published_at AS TIMESTAMP),
+                       CAST(updated_at AS TIMESTAMP),
+                       CAST(? AS TIMESTAMP)
+                FROM staging_comments
                 ON CONFLICT (comment_id) DO UPDATE SET
                     like_count = EXCLUDED.like_count,
                     reply_count = EXCLUDED.reply_count,
                     updated_at = EXCLUDED.updated_at,
                     cleaned_text = EXCLUDED.cleaned_text,
                     ingested_at = EXCLUDED.ingested_at
-            """, [
-                comment['comment_id'],
-                video_id,
-                category,
-                comment['author'],
-                raw_text,
-                cleaned,
-                comment['like_count'],
-                comment.get('reply_count', 0),
-                comment['published_at'],
-                comment.get('updated_at'),
-                datetime.now(timezone.utc).isoformat()
-            ])
-            records_processed += 1
+            """, [video_id, category, ingested_at])
+            
+            conn.execute("""
+                INSERT INTO ingest_offsets VALUES (?, ?)
+                ON CONFLICT (video_id) DO UPDATE SET bytes_ingested = EXCLUDED.bytes_ingested
+            """, [video_id, offset + len(data)])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.unregister('staging_comments')
+        records_processed = len(staging)
             
         logger.info(f"Upserted {records_processed} comments for video {video_id} into DuckDB.")
         
@@ -130,4 +270,26 @@ def process_file_to_duckdb(file_path: str, db_path: str = 'data/youtube.duckdb')
     finally:
         conn.close()
         
-    return video_id
\ No newline at end of file
+    return video_id
+
+@task(name="Export Comments to Parquet", tags=["database"])
+def export_comments_parquet(db_path: str = 'data/youtube.duckdb', output_path: str = 'data/comments.parquet') -> str:
+    """
+    Snapshot the comments table to zstd-compressed Parquet.
+    Downstream analysis can read_parquet() this columnar copy instead of
+    re-parsing the raw JSON files.
+    """
+    logger = get_run_logger()
+    
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    conn = duckdb.connect(db_path)
+    
+    try:
+        # COPY doesn't take a bound parameter for its target path
+        target = output_path.replace("'", "''")
+        conn.execute(f"COPY comments TO '{target}' (FORMAT PARQUET, COMPRESSION ZSTD)")
+        logger.info(f"Exported comments to {output_path}")
+    finally:
+        conn.close()
+    
+    return output_path
@@ -4,9 +4,15 @@ Analyzes sentiment using VADER and extracts key phrases using TF-IDF
 Updates DuckDB in batches - optimized for speed and reliability
 """
 
+import os
 import duckdb
-import json
+import orjson
 import logging
+import multiprocessing
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
 from datetime import datetime, timezone
 import nltk
 from nltk.sentiment import SentimentIntensityAnalyzer
@@ -26,29 +32,83 @@ try:
 except LookupError:
     nltk.download('punkt', quiet=True)
 
+# Batches smaller than this are scored in-process; below it, shipping texts to
+# workers costs more than the scoring it parallelizes
+PARALLEL_MIN_COMMENTS = 2000
+PARALLEL_CHUNKSIZE = 256
+
+# Compound-score buckets: <= -0.05 negative, >= 0.05 positive. The lower edge
+# is nudged up one ulp so -0.05 itself falls in the negative bucket.
+SENTIMENT_LABELS = np.array(['negative', 'neutral', 'positive'], dtype=object)
+LABEL_BINS = np.array([np.nextafter(-0.05, np.inf), 0.05])
+
+# Per-process memo of results by exact text: emoji-only replies, "first!" and
+# bot spam repeat across videos, and each entry is a short string
+TEXT_CACHE_SIZE = 65536
+
+# Rows scored and written back per round trip; large enough to use the pool
+ANALYZE_BATCH_SIZE = 10000
+
+# Conversational fillers RAKE ranks as phrases but that carry no topic
+FILLER_PHRASES = frozenset({
+    'looks like', 'look like', 'feel like', 'feels like',
+    'seems like', 'seem like', 'sounds like', 'sound like',
+    'really like', 'pretty much'
+})
+
+_sia = None
+_rake = None
+_process_pool = None
+
 
 def init_analyzer():
     """Helper to get analyzer instances."""
     return SentimentIntensityAnalyzer()
 
-def analyze_text_vader(sia, text: str) -> tuple:
-    """Analyze sentiment of text using VADER."""
+def get_analyzer():
+    """This process's analyzer, built on first use (once per pool worker)."""
+    global _sia
+    if _sia is None:
+        _sia = init_analyzer()
+    return _sia
+
+def get_rake() -> Rake:
+    """
+    This process's RAKE extractor, built on first use. Construction loads the
+    NLTK stopword list; extract_keywords_from_text resets its state per call.
+    """
+    global _rake
+    if _rake is None:
+        _rake = Rake(min_length=2, max_length=4)
+    return _rake
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Lazily start the scoring pool and keep it for later videos, so each
+    worker loads the VADER lexicon once per run rather than once per video.
+    Workers are spawned, not forked: Prefect's threads make fork unsafe.
+    """
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=os.cpu_count() or 1,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+    return _process_pool
+
+def score_text_vader(sia, text: str) -> float:
+    """VADER compound score of text; 0.0 (neutral) for empty or unscorable text."""
     if not text or not text.strip():
-        return 'neutral', 0.0
+        return 0.0
     
     try:
-        scores = sia.polarity_scores(text)
-        compound = scores['compound']
-        
-        if compound >= 0.05:
-            label = 'positive'
-        elif compound <= -0.05:
-            label = 'negative'
-        else:
-            label = 'neutral'
-        return label, compound
+        return sia.polarity_scores(text)['compound']
     except Exception:
-        return 'neutral', 0.0
+        return 0.0
+
+def label_compound_scores(scores: np.ndarray) -> np.ndarray:
+    """Map a whole array of compound scores to sentiment labels in one pass."""
+    return SENTIMENT_LABELS[np.digitize(scores, LABEL_BINS)]
 
 def extract_phrases_rake(text: str) -> list:
     """Extract meaningful phrases using RAKE."""
@@ -56,23 +116,16 @@ def extract_phrases_rake(text: str) -> list:
         return []
     
     try:
-        # Initialize RAKE
-        rake = Rake(min_length=2, max_length=4)
+        rake = get_rake()
         rake.extract_keywords_from_text(text)
         ranked_phrases = rake.get_ranked_phrases()
         
-        filler_patterns = {
-            'looks like', 'look like', 'feel like', 'feels like', 
-            'seems like', 'seem like', 'sounds like', 'sound like',
-            'really like', 'pretty much'
-        }
-        
         filtered_phrases = []
         seen = set()
         
         for phrase in ranked_phrases:
             p_lower = phrase.lower().strip()
-            if p_lower in filler_patterns: continue
+            if p_lower in FILLER_PHRASES: continue
             if len(p_lower) < 5 or p_lower.replace(' ', '').isdigit(): continue
             
             # Simple deduplication
@@ -86,6 +139,119 @@ def extract_phrases_rake(text: str) -> list:
     except Exception:
         return []
 
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def cached_vader_score(text: str) -> float:
+    """score_text_vader with this process's analyzer, memoized by text."""
+    return score_text_vader(get_analyzer(), text)
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def cached_phrases_json(text: str) -> str:
+    """extract_phrases_rake encoded as JSON text, memoized by text."""
+    return orjson.dumps(extract_phrases_rake(text)).decode()
+
+def score_comment(text: str, need_sentiment: bool = True, need_phrases: bool = True) -> tuple:
+    """
+    VADER score and RAKE phrases (as JSON text) for one comment. Whichever
+    isn't needed is skipped and returned as None.
+    """
+    score = cached_vader_score(text) if need_sentiment else None
+    phrases = cached_phrases_json(text) if need_phrases else None
+    return score, phrases
+
+def apply_sentiment_batch(conn, rows: list):
+    """
+    Score a batch of (comment_id, cleaned_text, need_sentiment, need_phrases)
+    rows and write back only the columns each row was missing.
+    """
+    comment_ids, texts, need_sentiment, need_phrases = map(list, zip(*rows))
+    
+    # Score each distinct text once (for whatever any of its rows needs) and
+    # map the results back through inverse; repeated comments are common
+    unique_index = {}
+    unique_texts, unique_need_sentiment, unique_need_phrases = [], [], []
+    inverse = np.empty(len(rows), dtype=np.intp)
+    
+    for i, (text, need_s, need_p) in enumerate(zip(texts, need_sentiment, need_phrases)):
+        # Fallback to empty string if text is None
+        text = text if text else ""
+        j = unique_index.get(text)
+        if j is None:
+            j = unique_index[text] = len(unique_texts)
+            unique_texts.append(text)
+            unique_need_sentiment.append(need_s)
+            unique_need_phrases.append(need_p)
+        else:
+            unique_need_sentiment[j] = unique_need_sentiment[j] or need_s
+            unique_need_phrases[j] = unique_need_phrases[j] or need_p
+        inverse[i] = j
+    
+    # VADER and RAKE are pure-Python CPU work, so large batches are
+    # sharded across worker processes
+    if len(unique_texts) >= PARALLEL_MIN_COMMENTS:
+        results = list(get_process_pool().map(
+            score_comment, unique_texts, unique_need_sentiment, unique_need_phrases,
+            chunksize=PARALLEL_CHUNKSIZE
+        ))
+    else:
+        results = [
+            score_comment(*args)
+            for args in zip(unique_texts, unique_need_sentiment, unique_need_phrases)
+        ]
+    
+    # Skipped scores become 0.0 here; the UPDATE below never writes them
+    unique_scores = np.fromiter(
+        (score if score is not None else 0.0 for score, _ in results), dtype=np.float64, count=len(results)
+    )
+    scores = unique_scores[inverse]
+    phrases_json = [results[j][1] for j in inverse]
+    
+    # One vectorized join against the registered frame instead of one
+    # UPDATE statement per comment
+    conn.register('sentiment_updates', pd.DataFrame({
+        'comment_id': comment_ids,
+        'need_sentiment': need_sentiment,
+        'need_phrases': need_phrases,
+        'sentiment_label': label_compound_scores(scores),
+        'sentiment_score': scores,
+        'phrases': phrases_json
+    }))
+    try:
+        conn.execute("""
+            UPDATE comments
+            SET sentiment_label = CASE WHEN u.need_sentiment THEN u.sentiment_label ELSE comments.sentiment_label END,
+                sentiment_score = CASE WHEN u.need_sentiment THEN u.sentiment_score ELSE comments.sentiment_score END,
+                phrases = CASE WHEN u.need_phrases THEN u.phrases ELSE comments.phrases END
+            FROM sentiment_updates u
+            WHERE comments.comment_id = u.comment_id
+        """)
+    finally:
+        conn.unregister('sentiment_updates')
+
+def refresh_video_summaries(conn, video_id: str):
+    """Rebuild the video_stats and phrase_stats rows for one video."""
+    conn.execute("DELETE FROM video_stats WHERE video_id = ?", [video_id])
+    conn.execute("""
+        INSERT INTO video_stats
+        SELECT video_id, category, sentiment_label,
+               COUNT(*) AS comment_count, SUM(sentiment_score) AS score_sum
+        FROM comments
+        WHERE video_id = ? AND sentiment_label IS NOT NULL
+        GROUP BY ALL
+    """, [video_id])
+    
+    conn.execute("DELETE FROM phrase_stats WHERE video_id = ?", [video_id])
+    conn.execute("""
+        INSERT INTO phrase_stats
+        SELECT video_id, category, sentiment_label, phrase, COUNT(*) AS count
+        FROM (
+            SELECT video_id, category, sentiment_label,
+                   UNNEST(from_json(phrases, '["VARCHAR"]')) AS phrase
+            FROM comments
+            WHERE video_id = ? AND sentiment_label IS NOT NULL
+        )
+        GROUP BY ALL
+    """, [video_id])
+
 @task(name="Analyze Sentiment", tags=["ml"])
 def analyze_video_sentiment(video_id: str, db_path: str = 'data/youtube.duckdb'):
     """
@@ -99,55 +265,67 @@ def analyze_video_sentiment(video_id: str, db_path: str = 'data/youtube.duckdb')
         return None
 
     conn = duckdb.connect(db_path)
-    sia = init_analyzer()
     
     try:
-        # 1. Select unprocessed comments for this specific video
-        # We check for sentiment_label IS NULL to avoid re-work
+        # 1. Select unprocessed comments for this specific video, flagging
+        # which of sentiment and phrases each one is actually missing
         query = """
-            SELECT comment_id, cleaned_text 
+            SELECT comment_id, cleaned_text,
+                   sentiment_label IS NULL AS need_sentiment,
+                   phrases IS NULL AS need_phrases
             FROM comments 
             WHERE video_id = ? AND (sentiment_label IS NULL OR phrases IS NULL)
+              AND cleaned_text <> ''
         """
-        rows = conn.execute(query, [video_id]).fetchall()
-        
-        if not rows:
-            logger.info(f"No new comments to analyze for video {video_id}")
-            return {'video_id': video_id, 'processed': 0}
-
-        logger.info(f"Analyzing {len(rows)} comments for video {video_id}...")
-        
-        update_data = []
+        # 2-3. Score and write back one batch at a time, so only one batch of
+        # Python row tuples is alive at once however large the backlog is
+        reader = conn.cursor()
+        processed = 0
         
-        # 2. Process in memory
-        for comment_id, text in rows:
-            # Fallback to empty string if text is None
-            safe_text = text if text else ""
+        # Every batch's UPDATE and the summary rebuild commit together: one
+        # WAL commit per video, and the dashboard never sees half a rebuild
+        conn.begin()
+        try:
+            # Empty comments score neutral with no phrases; settle them in SQL
+            # so only text that needs VADER/RAKE is streamed into Python
+            processed = conn.execute("""
+                UPDATE comments
+                SET sentiment_label = COALESCE(sentiment_label, 'neutral'),
+                    sentiment_score = CASE WHEN sentiment_label IS NULL THEN 0.0 ELSE sentiment_score END,
+                    phrases = COALESCE(phrases, '[]')
+                WHERE video_id = ? AND (sentiment_label IS NULL OR phrases IS NULL)
+                  AND COALESCE(cleaned_text, '') = ''
+            """, [video_id]).fetchone()[0]
             
-            label, score = analyze_text_vader(sia, safe_text)
-            phrases = extract_phrases_rake(safe_text)
+            reader.execute(query, [video_id])
+            while True:
+                rows = reader.fetchmany(ANALYZE_BATCH_SIZE)
+                if not rows:
+                    break
+                apply_sentiment_batch(conn, rows)
+                processed += len(rows)
+                logger.info(f"Analyzed {processed} comments for video {video_id}...")
             
-            update_data.append((
-                label, 
-                score, 
-                json.dumps(phrases), 
-                comment_id
-            ))
-            
-        # 3. Batch Update
-        conn.executemany("""
-            UPDATE comments
-            SET sentiment_label = ?,
-                sentiment_score = ?,
-                phrases = ?
-            WHERE comment_id = ?
-        """, update_data)
+            # 4. Refresh the dashboard's summary tables for this video
+            # (even with nothing new, so older databases get backfilled)
+            refresh_video_summaries(conn, video_id)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            reader.close()
+        
+        if not processed:
+            logger.info(f"No new comments to analyze for video {video_id}")
+            return {'video_id': video_id, 'processed': 0}
         
-        # 4. Get Summary Stats for Reporting
+        # 5. Get Summary Stats for Reporting, from the rollup just rebuilt
+        # rather than a second aggregation over the video's comments
         stats = conn.execute("""
-            SELECT sentiment_label, COUNT(*) 
-            FROM comments 
-            WHERE video_id = ? 
+            SELECT sentiment_label, SUM(comment_count)::BIGINT
+            FROM video_stats
+            WHERE video_id = ?
             GROUP BY sentiment_label
         """, [video_id]).fetchall()
         
@@ -157,7 +335,7 @@ def analyze_video_sentiment(video_id: str, db_path: str = 'data/youtube.duckdb')
         
         return {
             'video_id': video_id,
-            'processed': len(rows),
+            'processed': processed,
             'stats': stats_dict
         }
 